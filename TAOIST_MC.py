@@ -1,18 +1,37 @@
 import numpy as np
-from matplotlib import pyplot as plt
-from astropy.cosmology import WMAP9 as cosmo
-from scipy import integrate as integ
-import cdf_sampler as cds
+from scipy.special import wofz
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing as mp
 import sys
 
+# Numba is optional, when available the Lyman series
+# cross sections are computed with a compiled kernel
+try:
+    from numba import njit, prange, set_num_threads
+    has_numba = True
+except ImportError:
+    has_numba = False
+
+# Random number generator (PCG64) used for all sampling, set
+# TAOIST_MC.rng = np.random.default_rng(seed) to reproduce sightlines
+rng = np.random.default_rng()
+
+# Constants for the Lyman series cross sections. LAF_pref
+# collects the factors of Inoue & Iwata 2008 eq 10 that
+# are the same for every line and absorber.
+c_ang    = 2.998e18           #angst/s
+c_cm     = 2.998e10           #cm/s
+sig_T    = 6.625e-25          #cm^2
+LAF_pref = 4.0*c_cm*np.sqrt((3.*np.pi*sig_T)/8.)/np.sqrt(np.pi)
+
 # - - - - - - - - - - - - - - - - - - - - - - - - -
 # Retrieves the number of absorption systems in
 # each bin of HI column density in a given redshift
 # slice. This is based on the HI column density
 # distributions in Steidel et al. 2018, Appendix B,
 # Figure B1. Values calculated are passed into the
-# Poisson sampler of the numpy.random package to give
-# the randomly sampled absorbers in the current
+# Poisson sampler of the numpy.random Generator "rng" to give
+# the randomly sampled absorbers in each
 # redshift bin. This function is called from within
 # the function get_fzs().
 # - - - - - - - - - - - - - - - - - - - - - - - - -
@@ -20,60 +39,75 @@ import sys
 # dz   = integral of (1+z)**gamma from the start
 #        to the end of the redshift bin. See Steidel
 #        et al. 2018, Appendix B for gamma definitions.
-# dN   = linear spacing of logarithmic NHI bins.
+# DH_IGM, DH_CGM = integrals of the IGM and CGM
+#        f(NHI) power laws across each NHI bin, see
+#        do_Hint().
 # CGM  = flag to denote if CGM HI distribution to be
 #        used (where (z_em - z) <= 0.0023*(1.+z_em))
 # - - - - - - - - - - - - - - - - - - - - - - - - -
-# NOTE: values of dz, dN, and CGM are determined from
-#       within the function get_fzs()
+# NOTE: values of dz, DH_IGM, DH_CGM, and CGM are determined from
+#       within the function get_fzs(). dz and CGM may
+#       be column arrays with one row per redshift bin,
+#       in which case all bins are sampled at once.
 # - - - - - - - - - - - - - - - - - - - - - - - - -
-def one_Nabs(NHIs,dz,dN,DH_IGM,DH_CGM,CGM=False):
+def one_Nabs(NHIs,dz,DH_IGM,DH_CGM,CGM=False):
 
-    lH = 10.**(NHIs)
     # f(NHI,z) for log column densities below 15.2 for non-CGM and 13.0 for CGM
-    Ns = np.array((10.**9.305)*DH_IGM*dz[1])
-    if CGM:
-        # f(NHI,z) for CGM systems, log column density greater than 13.0
-        t  = np.where(NHIs[:-1] >= 13.0)[0]
-        Ns[t] = (10.**6.716)*DH_CGM[t]*dz[0]
-    if not CGM:
-        # f(NHI,z) for non-CGM, log column density greater than 15.2 
-        t  = np.where(NHIs[:-1] >= 15.2)[0]
-        Ns[t] = (10.**7.542)*DH_IGM[t]*dz[0]
+    Nlo = (10.**9.305)*DH_IGM*dz[1]
+    # f(NHI,z) for non-CGM, log column density greater than 15.2 
+    Ns  = np.where(NHIs[:-1] >= 15.2,(10.**7.542)*DH_IGM*dz[0],Nlo)
+    # f(NHI,z) for CGM systems, log column density greater than 13.0
+    Ns  = np.where(CGM & (NHIs[:-1] >= 13.0),(10.**6.716)*DH_CGM*dz[0],Ns)
 
     # RANDOMLY SAMPLED (POISSON) VALUES ARE RETURNED
-    return np.random.poisson(lam=Ns*0.82,size=(1,len(Ns)))
+    return rng.poisson(lam=Ns*0.82)
     
 # - - - - - - - - - - - - - - - - - - - - - - - - -
 # Computes integral of (1+z) and (1+z)**2.5. Gives
 # multiplicative factors to convert f(NHI,z) to a
 # poisson lambda value for random sampling.
 # - - - - - - - - - - - - - - - - - - - - - - - - -
-# z  = current redshift
+# z  = redshift grid, lower edges of the redshift slices,
+#      or a single redshift
 # dz = size of redshift slice
 # - - - - - - - - - - - - - - - - - - - - - - - - -
+# A scalar z returns scalars.
+# - - - - - - - - - - - - - - - - - - - - - - - - -
 def do_Zint(z,dz):
-    z1,z2 = z,z+dz
-    o1 = (((z2*z2)/2.)+z2)-(((z1*z1)/2.)+z1)
-    o2 = (0.285714*(z2**3.5))-(0.285714*(z1**3.5))
+    scalar = np.ndim(z) == 0
+    z = np.atleast_1d(z)
+    if len(z) == 0:
+        return [np.zeros(0),np.zeros(0)]
+
+    z2 = z+dz
+    o1 = ((z2*z2)/2.+z2)-((z*z)/2.+z)
+    # z**3.5 as z*z*z*sqrt(z) avoids a general power
+    o2 = 0.285714*(z2*z2*z2*np.sqrt(z2)-z*z*z*np.sqrt(z))
+    if scalar:
+        return [o1[0],o2[0]]
     return [o1,o2]
 
+# - - - - - - - - - - - - - - - - - - - - - - - - -
+# Computes the integral of the f(NHI) power laws
+# across each NHI bin for the IGM and CGM.
+# - - - - - - - - - - - - - - - - - - - - - - - - -
+# NHI = HI column density bins, log spacing
+# - - - - - - - - - - - - - - - - - - - - - - - - -
 def do_Hint(NHI):
     bl,bh,bc = 1.635,1.463,1.381
-    
+
+    # Integral of the NHI power law across each bin, H1 and H2
+    # are the linear bin edges. The final bin is left empty.
+    H  = 10.**(NHI)
+    H1,H2,lH = H[:-2],H[1:-1],NHI[:-2]
+    Il = ((H2**(1.-bl))-(H1**(1.-bl)))/(1.-bl)
+    Ih = ((H2**(1.-bh))-(H1**(1.-bh)))/(1.-bh)
+    Ic = ((H2**(1.-bc))-(H1**(1.-bc)))/(1.-bc)
+
     outIGM = np.zeros(len(NHI)-1)
     outCGM = np.zeros(len(NHI)-1)
-    for i in range(len(outIGM)-1):
-        H1,H2 = 10.**(NHI[i]),10.**(NHI[i+1])
-        if NHI[i] < 15.2:
-            outIGM[i] = ((H2**(1.-bl))-(H1**(1.-bl)))/(1.-bl)
-        else:
-            outIGM[i] = ((H2**(1.-bh))-(H1**(1.-bh)))/(1.-bh)
-            
-        if NHI[i] < 13.0:
-            outCGM[i] = ((H2**(1.-bl))-(H1**(1.-bl)))/(1.-bl)
-        else:
-            outCGM[i] = ((H2**(1.-bc))-(H1**(1.-bc)))/(1.-bc)
+    outIGM[:-1] = np.where(lH < 15.2,Il,Ih)
+    outCGM[:-1] = np.where(lH < 13.0,Il,Ic)
 
     return outIGM,outCGM
 
@@ -92,50 +126,55 @@ def do_Hint(NHI):
 def get_fzs(zs,zem,dz,NHIs,wav,do_CGM=True):
     # Create empty output array
     fzs = np.zeros((len(zs),len(NHIs)-1))
-    # Calculate linear size of logarithmically spaced NHI bins
-    dHI = np.array([10.**(NHIs[i+1])-10.**(NHIs[i]) for i in range(len(NHIs)-1)])
     DH1,DH2 = do_Hint(NHIs)
-    # Loop over redshifts
-    for i,z in enumerate(zs):
-        if (1.+z)*1216. >= wav[0]:
-            # Calculate integral of (1+z)^gamma across current redshift bin
-            DX = do_Zint(z,dz)
-
-        
-            # Switch to turn on CGM distribution
-            if zem-z <= 0.0023*(1.+zem) and do_CGM:
-                fzs[i] = one_Nabs(NHIs,DX,dHI,DH1,DH2,CGM=True)
-            else:
-                fzs[i] = one_Nabs(NHIs,DX,dHI,DH1,DH2,CGM=False)
+    # Only redshifts where Lya falls in the wavelength range,
+    # as a column so all redshift bins are sampled together
+    t  = (1.+zs)*1216. >= wav[0]
+    # No absorbers if wav starts redward of Lya at every z
+    if not t.any():
+        return fzs
+    zt = zs[t][:,None]
+    # Calculate integral of (1+z)^gamma across each redshift bin
+    DX = [o[:,None] for o in do_Zint(zs[t],dz)]
+    # Switch to turn on CGM distribution
+    CGM = (zem-zt <= 0.0023*(1.+zem)) & do_CGM
+    fzs[t] = one_Nabs(NHIs,DX,DH1,DH2,CGM=CGM)
             
     return fzs
 
 # - - - - - - - - - - - - - - - - - - - - - - - - -
 # Computes the optical depth for LyC photons for
-# an absorber of column density NHI at redshift z.
+# absorbers of column density NHI at redshift z.
 # - - - - - - - - - - - - - - - - - - - - - - - - -
-# NHI = hydrogen column density
+# NHI = hydrogen column density, one per absorber
 # lam = wavelength array
-# z   = redshift of absorber
+# z   = redshift, one per absorber
 # - - - - - - - - - - - - - - - - - - - - - - - - -
 # returns array with length len(lam) of optical
-# depth (tau) values at each wavelength. Convert to
-# transmission with "np.exp((-1.)*tau)"
+# depth (tau) values at each wavelength summed over
+# all absorbers. Convert to transmission with
+# "np.exp((-1.)*tau)"
 # - - - - - - - - - - - - - - - - - - - - - - - - -
 def tau_HI_LyC(NHI,lam,z):
-    l_lc = 911.8*(1.+z)
+    NHI  = np.atleast_1d(NHI)[:,None]
+    l_lc = 911.8*(1.+np.atleast_1d(z)[:,None])
     
-    x = lam/l_lc
-    tau = NHI*(6.3e-18)*(x*x*x)
-
-    t = (lam/l_lc > 1.)
-    t = np.where(t == True)
-    tau[t[0]] = 0.
-
-    return tau
+    # x has shape (n(absorbers),len(lam)), tau is built
+    # in place to avoid further temporaries of that size
+    x   = lam/l_lc
+    tau = np.multiply(x,x)
+    tau*= x
+    tau*= NHI*(6.3e-18)
+    # No LyC absorption redward of the Lyman limit
+    tau[x > 1.] = 0.
+    return tau.sum(axis=0)
 
 # - - - - - - - - - - - - - - - - - - - - - - - - -
-# Voigt profile approximation from Tepper-Garcia 2006.
+# Voigt function H(a,x), evaluated as the real part
+# of the Faddeeva function with scipy.special.wofz.
+# The profile is not truncated, so the Lorentzian
+# damping wings of high column density absorbers
+# extend over the whole wavelength array.
 # Used to compute the Ly-alpha forest transmission
 # with "tau_HI_LAF" below.
 # - - - - - - - - - - - - - - - - - - - - - - - - -
@@ -146,89 +185,175 @@ def tau_HI_LyC(NHI,lam,z):
 #         taken from VPFIT table
 # - - - - - - - - - - - - - - - - - - - - - - - - -
 # returns array with voigt profile for current
-# lyman line with length equal to len(lam)
-# - - - - - - - - - - - - - - - - - - - - - - - - -
-def voigt_approx(lam,lami,b,gamma):
-    c = 2.998e18 # angst/s
-    ldl = (b/c)*lami
-    a = ((lami*lami)*gamma)/(4.*np.pi*c*ldl)
-    t_vp = np.where(np.abs(lam-lami) <= (1.812*(b/1.e13)))
-    t_vp = t_vp[0]
-    
-    x = (lam[t_vp]-lami)/ldl
-
-    A1 = np.exp((-1.)*x*x)
-    A2= a*(2./np.sqrt(np.pi))
+# lyman line with length equal to len(lam). Inputs
+# are broadcast, so passing lam[:,None] with arrays
+# of lami and gamma gives one column per line.
+# - - - - - - - - - - - - - - - - - - - - - - - - -
+def voigt(lam,lami,b,gamma):
+    ldl = (b/c_ang)*lami
+    a = ((lami*lami)*gamma)/(4.*np.pi*c_ang*ldl)
+    x = (lam-lami)/ldl
 
-    K1 = (1./(2.*x*x))
-    K2 = ((4.*x*x)+3.)*((x*x)+1.)*A1
-    K3 = (1./(x*x))*((2.*x*x)+3.)*(np.sinh(x*x))
+    return wofz(x+(1j*a)).real
 
-    Kx = K1*(K2-K3)
+# - - - - - - - - - - - - - - - - - - - - - - - - -
+# Compiled alternative to "voigt" used when numba is
+# installed. humlicek_w4 is the four region rational
+# approximation of the Faddeeva function from
+# Humlicek 1982 (JQSRT 27, 437), accurate to ~1e-4,
+# and returns H(a,x) for x and y=a. tau_kernel sums
+# the LyC absorption and the profiles of all Lyman
+# lines of all absorbers at each wavelength in one
+# pass, without building temporary arrays and with
+# the GIL released.
+# - - - - - - - - - - - - - - - - - - - - - - - - -
+# wav = observed wavelength array
+# z   = redshift, one per absorber
+# NHI = hydrogen column density for LyC absorption,
+#       one per absorber (zeros for Lyman lines only)
+# A   = strength of each line of each absorber, shape
+#       (n(absorbers),n(lines)) (prefactor of H(a,x))
+# ldl = doppler width of each line of each absorber
+# a   = damping parameter a of each line of each absorber
+# li  = Lyman line central wavelengths
+# - - - - - - - - - - - - - - - - - - - - - - - - -
+if has_numba:
 
-    xo = np.zeros(len(lam))
-    xo[t_vp] = A1*(1.-(A2*Kx))
+    @njit(fastmath=True,cache=True)
+    def humlicek_w4(x,y):
+        t = complex(y,-x)
+        s = abs(x)+y
+        if s >= 15.:
+            w = t*0.5641896/(0.5+t*t)
+        elif s >= 5.5:
+            u = t*t
+            w = t*(1.410474+u*0.5641896)/(0.75+u*(3.+u))
+        elif y >= 0.195*abs(x)-0.176:
+            w = (16.4955+t*(20.20933+t*(11.96482+t*(3.778987+t*0.5642236))))/ \
+                (16.4955+t*(38.82363+t*(39.27121+t*(21.69274+t*(6.699398+t)))))
+        else:
+            u = t*t
+            w = np.exp(u)-t*(36183.31-u*(3321.9905-u*(1540.787-u*(219.0313-u*(35.76683-u*(1.320522-u*0.56419))))))/ \
+                (32066.6-u*(24322.84-u*(9022.228-u*(2186.181-u*(364.2191-u*(61.57037-u*(1.841439-u)))))))
+        return w.real
 
-    return xo
+    @njit(parallel=True,fastmath=True,cache=True,nogil=True)
+    def tau_kernel(wav,z,NHI,A,ldl,a,li):
+        tau = np.zeros(wav.size)
+        for k in prange(wav.size):
+            acc = 0.
+            for i in range(z.size):
+                lam = wav[k]/(1.+z[i])
+                # LyC absorption only beyond the Lyman limit, as
+                # in "tau_HI_LyC", Lyman series lines otherwise
+                if lam <= 911.8:
+                    x = lam/911.8
+                    acc += NHI[i]*(6.3e-18)*(x*x*x)
+                    continue
+                for j in range(li.size):
+                    acc += A[i,j]*humlicek_w4((lam-li[j])/ldl[i,j],a[i,j])
+            tau[k] = acc
+        return tau
 
 # - - - - - - - - - - - - - - - - - - - - - - - - -
 # Doppler parameter distribution function taken from
 # Inoue & Iwata 2008, eq 6. Used to randomly sample
 # a doppler broadening for a given absorber. Sampling
-# is done using inverse cdf sampling with
-# cdf_sampler.py
+# is done using inverse cdf sampling with "sample_b"
 # - - - - - - - - - - - - - - - - - - - - - - - - -
 # b = doppler broadening
 # - - - - - - - - - - - - - - - - - - - - - - - - -
 def doppler_dist(b):
-    bs = 23.
-    A1 = (4.*bs*bs*bs*bs)/(b*b*b*b*b)
-    A2 = np.exp((-1.)*A1*b/4.)
+    bs4 = 279841. # bs**4 with bs = 23 km/s
+    b4  = (b*b)*(b*b)
+    A1  = (4.*bs4)/(b4*b)
+    # A1*b/4 reduces to bs**4/b**4
+    A2  = np.exp((-1.)*bs4/b4)
     return A1*A2
 
+# The doppler distribution is fixed, so its cdf is
+# built once on import and shared by all absorbers.
+b_grid = np.arange(1,1000,.1)
+b_cdf  = np.cumsum(doppler_dist(b_grid))
+b_cdf /= b_cdf[-1]
+
+# - - - - - - - - - - - - - - - - - - - - - - - - -
+# Randomly samples doppler broadenings from
+# "doppler_dist" by inverting the cdf above.
+# - - - - - - - - - - - - - - - - - - - - - - - - -
+# n = number of samples
+# - - - - - - - - - - - - - - - - - - - - - - - - -
+# returns array of n doppler broadenings in angst/s
+# - - - - - - - - - - - - - - - - - - - - - - - - -
+def sample_b(n):
+    return np.interp(rng.random(n),b_cdf,b_grid)*1.e13
+
+# - - - - - - - - - - - - - - - - - - - - - - - - -
+# Line strengths (the prefactor of H(a,x) from Inoue
+# & Iwata 2008 eq 10 times the column density),
+# doppler widths and damping parameters of every
+# Lyman line of every absorber, as in "voigt".
+# - - - - - - - - - - - - - - - - - - - - - - - - -
+# NHI = hydrogen column density, one per absorber
+# b   = doppler broadening (angst/s), one per absorber
+# li, fi, gi = Lyman line wavelengths, oscillator
+#       strengths and damping parameters
 # - - - - - - - - - - - - - - - - - - - - - - - - -
-# Computes the Lyman line forest cross-sections as
+# returns A, ldl and a, each of shape
+# (n(absorbers),n(lines))
+# - - - - - - - - - - - - - - - - - - - - - - - - -
+def laf_lines(NHI,b,li,fi,gi):
+    NHI = np.atleast_1d(NHI)[:,None]
+    b   = np.atleast_1d(b)[:,None]
+
+    A   = LAF_pref*NHI*(fi*li)/b
+    ldl = (b/c_ang)*li
+    a   = ((li*li)*gi)/(4.*np.pi*c_ang*ldl)
+    return A,ldl,a
+
+# - - - - - - - - - - - - - - - - - - - - - - - - -
+# Computes the Lyman line forest optical depth as
 # a function of wavelength following Inoue & Iwata
-# 2008 eq 10. To convert to an optical depth spectrum,
-# multiply by the column density of the current
-# absorber as in "make_tau".
+# 2008 eq 10, i.e. the cross-sections multiplied by
+# the column density of each absorber.
 # - - - - - - - - - - - - - - - - - - - - - - - - -
+# NHI = hydrogen column density, one per absorber
 # wav = wavelength array (angstroms)
-# z   = redshift
+# z   = redshift, one per absorber
+# b   = doppler broadening (angst/s), one per
+#       absorber, see "sample_b"
+# li  = Lyman line central wavelengths (angstroms)
+# fi  = Lyman line oscillator strengths
+# gi  = Lyman line damping parameters
 # - - - - - - - - - - - - - - - - - - - - - - - - -
-# returns cross section spectrum for Lyman lines
+# returns optical depth spectrum for Lyman lines
+# summed over all absorbers
 # - - - - - - - - - - - - - - - - - - - - - - - - -
-def tau_HI_LAF(wav,z):
-    me,ce,c = 9.1094e-31,1.6022e-19,2.99792e18
-    sig_T = 6.625e-25       #cm^2
-    c     = 2.998e10        #cm/s
+def tau_HI_LAF(NHI,wav,z,b,li,fi,gi):
+    z   = np.atleast_1d(z)
+    b   = np.atleast_1d(b)[:,None]
 
-    tau = np.zeros(len(wav))
-    lam = wav/(1.+z)
-
-    bx = np.arange(1,1000,.1)
-    by = doppler_dist(bx)
-    bcds  =  cds.cdf_sampler(bx,by)
-    bcds.sample_n(1)
-    
-    b  = bcds.sample[0]*1.e13  #angstrom/s
-    for i in range(len(LAF_table[:,0])):
-        fi    = LAF_table[i,1]  
-        li    = LAF_table[i,0]  #angstrom
-        gamma = LAF_table[i,2]
+    # Line strengths, shape (n(absorbers),n(lines))
+    A,ldl,a = laf_lines(NHI,b[:,0],li,fi,gi)
 
-        A1 = c*np.sqrt((3.*np.pi*sig_T)/8.)
-        A2 = (fi*li)/(np.sqrt(np.pi)*b)
-        A3 = voigt_approx(lam,li,b,gamma)
+    # The profiles are kept in double precision. scipy's wofz is
+    # slower for complex64 than complex128, and in single precision
+    # the offsets from line centre (lam-li, with lam ~ 1000A and
+    # doppler widths ~ 0.05A) lose enough to shift T by ~1e-3.
+    if has_numba:
+        return tau_kernel(wav,z,np.zeros(len(z)),A,ldl,a,li)
 
-        tm_tau = 4.0*A1*A2*A3
-        bad = np.where(np.isfinite(tm_tau) == False)
-        tm_tau[bad[0]] = 0.
-        tau+=tm_tau
+    # Voigt profiles have shape (n(absorbers),len(wav),n(lines)),
+    # so absorbers are done in chunks to limit memory use
+    tau = np.zeros(len(wav))
+    nch = max(1,(2**22)//(len(wav)*len(li)))
+    for i in range(0,len(z),nch):
+        lam = wav/(1.+z[i:i+nch,None])
+        A3  = voigt(lam[:,:,None],li,b[i:i+nch,:,None],gi)
+        tmp = np.einsum('ikj,ij->ik',A3,A[i:i+nch])
+        tmp[lam <= 911.8] = 0.
+        tau+= tmp.sum(axis=0)
 
-    
-    tau[np.where(lam <= 911.8)[0]] = 0.
-        
     return tau
 
 # - - - - - - - - - - - - - - - - - - - - - - - - -
@@ -248,35 +373,117 @@ def tau_HI_LAF(wav,z):
 def make_tau(zs,fzs,lNHIs,wav):
 
     HIm = 10.**(lNHIs)
-    zem = np.max(zs)
-    tau = np.zeros(len(wav))
-    for i in range(len(zs)):
-        if np.max(fzs[i]) != 0.:
-            t = np.where(fzs[i] > 0.)[0]
+    # One absorber for each occupied (z,NHI) bin
+    iz,iN = np.nonzero(fzs)
+    zabs  = zs[iz]
+    Nabs  = HIm[iN]
+    babs  = sample_b(len(zabs))
 
-            for j in t:
-                cdt = HIm[j]
-                tau+=tau_HI_LyC(cdt,wav,zs[i])
-                tau+=cdt*tau_HI_LAF(wav,zs[i])
+    if has_numba:
+        # LyC and Lyman series absorption in a single compiled pass
+        A,ldl,a = laf_lines(Nabs,babs,LAF_li,LAF_fi,LAF_gi)
+        return tau_kernel(wav,zabs,Nabs,A,ldl,a,LAF_li)
+
+    tau = tau_HI_LyC(Nabs,wav,zabs)
+    tau+= tau_HI_LAF(Nabs,wav,zabs,babs,LAF_li,LAF_fi,LAF_gi)
 
     return tau
 
+# - - - - - - - - - - - - - - - - - - - - - - - - -
+# Worker functions for "make_tau_batch". Each worker
+# process runs a single threaded numba kernel, and
+# each sightline seeds "rng" from its own child of a
+# numpy SeedSequence, giving independent streams.
+# - - - - - - - - - - - - - - - - - - - - - - - - -
+def batch_init():
+    if has_numba: set_num_threads(1)
+
+def one_sightline(seed,zs,zem,dz,NHIs,wav,do_CGM):
+    global rng
+    rng = np.random.default_rng(seed)
+
+    fzs = get_fzs(zs,zem,dz,NHIs,wav,do_CGM=do_CGM)
+    return make_tau(zs,fzs,NHIs[:-1],wav)
+
+# - - - - - - - - - - - - - - - - - - - - - - - - -
+# Create the process pool used by "make_tau_batch".
+# Processes are started with "spawn" (fork is not
+# safe once numba's threads are running), so scripts
+# using it need an if __name__ == '__main__' guard,
+# and should keep heavy imports inside that guard as
+# each worker re-imports the calling script. Reuse
+# one pool for several batches to avoid restarting
+# the workers, e.g.
+#     with tao.batch_pool() as ex:
+#         taus = tao.make_tau_batch(...,executor=ex)
+# - - - - - - - - - - - - - - - - - - - - - - - - -
+# max_workers = number of processes, default is the
+#               number of cores
+# - - - - - - - - - - - - - - - - - - - - - - - - -
+def batch_pool(max_workers=None):
+    return ProcessPoolExecutor(max_workers=max_workers,mp_context=mp.get_context('spawn'),
+                               initializer=batch_init)
+
+# - - - - - - - - - - - - - - - - - - - - - - - - -
+# Create the optical depth spectra for n independent
+# sightlines in parallel over processes. Equivalent
+# to calling "get_fzs" and "make_tau" n times.
+# - - - - - - - - - - - - - - - - - - - - - - - - -
+# n           = number of sightlines
+# zs          = redshift array
+# zem         = redshift of the source
+# dz          = redshift bin size
+# NHIs        = array of log(HI column density)
+# wav         = wavelength array
+# do_CGM      = include CGM absorbers, see "get_fzs"
+# seed        = seed for the SeedSequence, None for
+#               a random seed
+# max_workers = number of processes, default is the
+#               number of cores (ignored if executor
+#               is given)
+# executor    = pool from "batch_pool" to reuse, None
+#               to start and stop a new one
+# - - - - - - - - - - - - - - - - - - - - - - - - -
+# returns array of shape (n,len(wav)) of optical
+# depth spectra
+# - - - - - - - - - - - - - - - - - - - - - - - - -
+def make_tau_batch(n,zs,zem,dz,NHIs,wav,do_CGM=True,seed=None,max_workers=None,executor=None):
+    seeds = np.random.SeedSequence(seed).spawn(n)
+    args  = [[zs]*n,[zem]*n,[dz]*n,[NHIs]*n,[wav]*n,[do_CGM]*n]
+
+    if executor is not None:
+        return np.array(list(executor.map(one_sightline,seeds,*args)))
+
+    with batch_pool(max_workers) as ex:
+        taus = list(ex.map(one_sightline,seeds,*args))
+
+    return np.array(taus)
+
 
 # - - - - - - - - - - - - - - - - - - - - - - - - -
 # When imported as a module, load the Lyman series
-# table as a global variable. This table is used to
-# compute Lyman series line absorption and is called
-# from the function "tau_HI_LAF", which is itself
-# called from within "make_tau". The file is located
+# table as a global variable. The wavelength, oscillator
+# strength and damping columns are kept as contiguous
+# arrays (LAF_li, LAF_fi, LAF_gi) which "make_tau"
+# passes to "tau_HI_LAF". The file is located
 # in the TAOIST-MC folder, which should be added to
-# your python path. 
+# your python path. Worker processes (see
+# "make_tau_batch") load the table silently.
 # - - - - - - - - - - - - - - - - - - - - - - - - -
 if __name__ != '__main__':
 
+    # Spawned workers are named (e.g. SpawnProcess-1) before they
+    # re-import the calling script, so this also holds then
+    is_worker = mp.current_process().name != 'MainProcess'
     flag = 0
     for p in sys.path:
         try:
             LAF_table = np.loadtxt(f'{p}/Lyman_series.dat',float)
+            LAF_li = LAF_table[:,0].copy()
+            LAF_fi = LAF_table[:,1].copy()
+            LAF_gi = LAF_table[:,2].copy()
+            flag = 1
+            if is_worker: continue
             print('\n')
             print(' - - - - - - - - - - - - - - - - - - - - - - - - - - - ')
             print('Lyman series data loaded from:')
@@ -285,10 +492,12 @@ if __name__ != '__main__':
             print('\n')
             print('....mocking the IGM....')
             print('\n')
-            flag = 1
         except:
             pass
 
+    if flag == 0 and is_worker:
+        raise ImportError('Lyman_series.dat not found on the python path')
+
     if flag == 0:
         print('\n')
         print(' - - - - - - - - - - - - - - - - - - - - - - - - - - - ')
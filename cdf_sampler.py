@@ -1,6 +1,11 @@
 import numpy as np
 import scipy.interpolate as interp
 
+# Random number generator (PCG64) used when sample_n is
+# not given one, set cdf_sampler.rng =
+# np.random.default_rng(seed) for reproducible samples
+rng = np.random.default_rng()
+
 class cdf_sampler(object):
 
     # __init__ computed the normalisation
@@ -16,20 +21,17 @@ class cdf_sampler(object):
 
     # sample_n in produces a random sample
     # of n with a distribution matched to the
-    # input array, y.
-    def sample_n(self,n):
+    # input array, y. Random numbers are drawn
+    # from the numpy Generator gen, the module
+    # level rng is used if none is given. The
+    # cdf is inverted for all n samples at once
+    # with a binary search (np.searchsorted).
+    def sample_n(self,n,gen=None):
+        if gen is None: gen = rng
 
-        self.sample = np.zeros(n)
-        for i in range(n):
-            tm = np.random.uniform()
-            tt = np.where(np.abs(tm-self.cdf) == np.min(np.abs(tm-self.cdf)))
-            if len(tt[0]) > 1:
-                bi = np.random.binomial(1,.5)
-                bi = int((-1.)*bi)
-                self.sample[i] = self.x_input[tt[0][bi]]
-                
-            else:
-                self.sample[i] = self.x_input[tt[0]]
+        x  = np.asarray(self.x_input)
+        tt = np.searchsorted(self.cdf,gen.random(n))
+        self.sample = x[np.clip(tt,0,len(x)-1)]
 
             
 # Subclass histogram oversampler creates a
@@ -59,14 +61,15 @@ class histogram_oversampler(cdf_sampler):
         dx= bin_edges[1]-bin_edges[0]
         
         x = np.arange(bin_edges[0],bin_edges[-1],dx/float(os_factor))
-        y = np.zeros(len(x))
-        
-        for i in range(len(bin_edges)-1):
-            tm = (x >= bin_edges[i])&(x <= bin_edges[i+1])
-            tm = np.where(tm == True)
-            y[tm[0]] = n[i]
+        # Each sub-bin takes the value of the last
+        # histogram bin whose lower edge is <= x. Sub-bins
+        # outside the histogram (np.arange can overshoot
+        # the last edge) are left empty.
+        tm = np.searchsorted(bin_edges,x,side='right')-1
+        y  = np.asarray(n,float)[np.clip(tm,0,len(n)-1)]
+        y[(x < bin_edges[0]) | (x > bin_edges[-1])] = 0.
 
-        if spline == True:
+        if spline:
             xspl = bin_edges[:-1]+(dx/2.)
             xspl = np.concatenate((np.array([xspl[0]-(dx/1.5)]),xspl))
             xspl = np.concatenate((xspl,np.array([xspl[-1]+(dx/1.5)])))
@@ -74,8 +77,7 @@ class histogram_oversampler(cdf_sampler):
             nspl = np.concatenate((nspl,np.array([0])))
             f = interp.interp1d(xspl,nspl,kind='cubic')
             y = f(x)
-            tt= np.where(y < 0.)
-            if len(tt[0]) > 0: y[tt[0]] = 0.
+            y[y < 0.] = 0.
             self.spl = np.array([x,y])
         
         cdf_sampler.__init__(self,x,y)
@@ -1,7 +1,4 @@
 import numpy as np
-from matplotlib import pyplot as plt
-from astropy.cosmology import WMAP9 as cosmo
-from scipy import integrate as integ
 import warnings
 
 import TAOIST_MC as tao
@@ -10,8 +7,13 @@ import TAOIST_MC as tao
 # AT z=3.05 BASED ON APPENDIX B OF STEIDEL ET AL. 2018.
 # AS WRITTEN, USES IGM+CGM MODEL, IGM ONLY CAN BE
 # PRODUCED BY CHANGING "do_CGM" to False IN THE LINE:
-# Nab = tao.get_fzs(zs,zem,dz,NHIs,do_CGM=True)
+# taua = tao.make_tau_batch(nex,zs,zem,dz,NHIs,wav,do_CGM=True)
 if __name__ == '__main__':
+    # Imported here so the worker processes of
+    # make_tau_batch, which re-import this script,
+    # do not load matplotlib
+    from matplotlib import pyplot as plt
+
     # IGNORE OVERFLOW WARNINGS IN TAOIST-MC
     warnings.filterwarnings("ignore")
     
@@ -30,12 +32,8 @@ if __name__ == '__main__':
 
     F  = plt.figure(figsize=(5,5),dpi=150)
     ax = F.add_subplot(111)
-    taua= np.zeros((nex,len(wav)))
-    for i in range(nex):
-
-        Nab = tao.get_fzs(zs,zem,dz,NHIs,wav,do_CGM=True)
-        tm_tau = tao.make_tau(zs,Nab,NHIs[:-1],wav)
-        taua[i,:] = tm_tau
+    # Sightlines are computed in parallel over all cores
+    taua = tao.make_tau_batch(nex,zs,zem,dz,NHIs,wav,do_CGM=True)
 
     taum = np.mean(np.exp((-1.)*taua),axis=0)
 
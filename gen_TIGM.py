@@ -1,14 +1,8 @@
 import numpy as np
-import matplotlib.pyplot as plt
-import matplotlib as mpl
 import warnings
 import glob
 import os
 
-from astropy.cosmology import WMAP9 as cosmo
-from scipy import integrate as integ
-
-import cdf_sampler as cds
 import TAOIST_MC as tao
 
 def colorFader(c1,c2,mix):
@@ -29,6 +23,11 @@ def colorFade3(c1,c2,c3,mix):
     return out
 
 if __name__ == '__main__':
+    # Imported here so the worker processes of
+    # make_tau_batch, which re-import this script,
+    # do not load matplotlib
+    import matplotlib.pyplot as plt
+    import matplotlib as mpl
 
     warnings.filterwarnings("ignore")
     do_plot = True
@@ -52,6 +51,8 @@ if __name__ == '__main__':
     if do_plot:
         F  = plt.figure(figsize=(9,5),dpi=150)
         ax = F.add_subplot(111)
+    # One pool of worker processes for all redshifts
+    ex = tao.batch_pool()
     for i,zem in enumerate(zems):
         # DOUBLE CHECK FILE LOCATION EXISTS
         if f'taus/{zem}' not in dirs:
@@ -64,12 +65,8 @@ if __name__ == '__main__':
         taus  = np.zeros((n_sightline+1,len(wav)))
         taus[0] = wav
 
-        for j in range(n_sightline):
-
-            Nab    = tao.get_fzs(zs,zem,dz,NHIs,wav)
-            tm_tau = tao.make_tau(zs,Nab,NHIs[:-1],wav)
-
-            taus[j+1]  = tm_tau
+        # Sightlines are computed in parallel over all cores
+        taus[1:] = tao.make_tau_batch(n_sightline,zs,zem,dz,NHIs,wav,do_CGM=add_CGM,executor=ex)
 
         if do_plot:
             c = colorFade3('gold','darkcyan','k',float(i)/float(len(zems)-1))
@@ -77,6 +74,7 @@ if __name__ == '__main__':
             
         print('\n')
         np.save(f'./taus/{zem}/taus_{n_sightline}{size_ver}.npy',taus)
+    ex.shutdown()
 
     ax.set_xlabel(r'$\lambda_{obs}$',fontsize=20)
     ax.set_ylabel(r'$T_{IGM}$',fontsize=20)